@@ -1,7 +1,83 @@
-"""Shared fixtures and path configuration for tests."""
+"""Shared fixtures and environment configuration for tests."""
 
-import sys
+import os
+import subprocess
+from collections.abc import Callable
 from pathlib import Path
+from typing import Any
 
-# Add project root to sys.path so `import git_bundle` works
-sys.path.insert(0, str(Path(__file__).parent.parent))
+import pytest
+
+# Tests check roundtrips, not ratios: compress every archive at the fastest
+# zstd level unless the caller chose one.
+os.environ.setdefault("GIT_BUNDLE_ZSTD_LEVEL", "1")
+
+# Keep tmp_path and friends in RAM where Linux provides a tmpfs: the suite
+# writes and rereads every mirror, tarball, and restore. pytest reads this
+# variable lazily, and --basetemp still takes precedence.
+if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK):
+    os.environ.setdefault("PYTEST_DEBUG_TEMPROOT", "/dev/shm")
+
+
+class FakeRunner:
+    """Drop-in for ``git_bundle.run_command`` that records instead of running.
+
+    Every call is appended to ``calls`` as ``(cmd, kwargs)``, with ``cmd`` as
+    a tuple and ``cwd`` among the keyword arguments. Each call is answered
+    from ``results``, a dispatch table keyed by :meth:`subcommand` (e.g.
+    ``run_cmd.results["ls-tree"] = ...``), then by the first matching
+    :meth:`route`, and otherwise with a shared successful ``CompletedProcess``.
+    Exceptions found either way are raised instead of returned.
+    """
+
+    OK = subprocess.CompletedProcess([], 0, "", "")
+
+    def __init__(self) -> None:
+        self.calls: list[tuple[tuple[str, ...], dict[str, Any]]] = []
+        self.results: dict[str, Any] = {}
+        self._routes: list[tuple[Callable[[list[str], Path], bool], Any]] = []
+
+    @staticmethod
+    def subcommand(cmd: list[str]) -> str:
+        """Return the git subcommand of ``cmd``, skipping ``-c`` options, or its program."""
+        if cmd[0] != "git":
+            return cmd[0]
+        i = 1
+        while cmd[i] == "-c":
+            i += 2
+        return cmd[i]
+
+    def route(self, predicate: Callable[[list[str], Path], bool], result: Any) -> None:
+        """Answer calls for which ``predicate(cmd, cwd)`` holds with ``result``.
+
+        For results that depend on more than the subcommand, such as the
+        working directory.
+        """
+        self._routes.append((predicate, result))
+
+    @property
+    def cmds(self) -> list[tuple[str, ...]]:
+        """The recorded commands, in call order."""
+        return [cmd for cmd, _ in self.calls]
+
+    def ran(self, *tokens: str) -> bool:
+        """Return True if some recorded command contains every one of ``tokens``."""
+        wanted = frozenset(tokens)
+        return any(wanted.issubset(cmd) for cmd in self.cmds)
+
+    def __call__(self, cmd: list[str], cwd: Path, **kwargs: Any) -> Any:
+        self.calls.append((tuple(cmd), {"cwd": cwd, **kwargs}))
+        result = self.results.get(self.subcommand(cmd))
+        if result is None:
+            result = next((res for pred, res in self._routes if pred(cmd, cwd)), self.OK)
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+
+@pytest.fixture()
+def run_cmd(monkeypatch):
+    """Replace ``git_bundle.run_command`` with a :class:`FakeRunner`."""
+    fake = FakeRunner()
+    monkeypatch.setattr("git_bundle.run_command", fake)
+    return fake
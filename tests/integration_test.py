@@ -2,11 +2,17 @@
 """Integration tests for git_bundle.py.
 
 These tests create real Git repos on disk and exercise the full
-archive -> unpack -> verify cycle. They require git, git-lfs, and tar.
+archive -> unpack -> verify cycle. They require git, git-lfs, tar, and zstd,
+and are skipped when any of them is missing.
 
 Run with:  pytest tests/integration_test.py -v
 """
 
+import contextlib
+import fcntl
+import hashlib
+import io
+import os
 import shutil
 import subprocess
 import sys
@@ -14,31 +20,105 @@ from pathlib import Path
 
 import pytest
 
+from git_bundle import main as bundle_main
+
 SCRIPT_DIR = Path(__file__).parent.resolve()
 BUNDLE_SCRIPT = SCRIPT_DIR.parent / "git_bundle.py"
 GENERATE_SCRIPT = SCRIPT_DIR / "generate_test_repo.py"
-TEST_ROOT = Path("/tmp/git_bundler_integration_test")
+# Each tool is looked up once, at import. git-lfs's path also keys the repo
+# cache. GitArchiver requires git, git-lfs, and tar, and most tests archive
+# with the default zstd compression; without any of them every test would fail.
+_GIT_LFS = shutil.which("git-lfs")
+_TOOLS = {"git-lfs": _GIT_LFS, **{tool: shutil.which(tool) for tool in ("git", "tar", "zstd")}}
+_MISSING_TOOLS = [tool for tool, path in _TOOLS.items() if path is None]
+
+pytestmark = pytest.mark.skipif(
+    bool(_MISSING_TOOLS), reason=f"{', '.join(_MISSING_TOOLS)} not installed"
+)
+
+
+def _source_cache_dir() -> Path:
+    """Cache directory for the generated source repos.
+
+    Keyed on the generator script, the Python version, and the git-lfs
+    binary, so changing any of them regenerates the repos.
+    """
+    key = hashlib.sha256(GENERATE_SCRIPT.read_bytes())
+    key.update(f"{sys.version_info[:2]} {_GIT_LFS}".encode())
+    cache_home = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache")
+    return cache_home / "git_bundler_tests" / key.hexdigest()[:16]
 
 
 @pytest.fixture(scope="session")
 def test_repo():
-    """Generate a test repository once for the entire test session."""
-    if TEST_ROOT.exists():
-        shutil.rmtree(TEST_ROOT)
-    TEST_ROOT.mkdir()
-
-    source_dir = TEST_ROOT / "source"
-    subprocess.run(
-        [sys.executable, str(GENERATE_SCRIPT), "--out", str(source_dir)],
-        check=True,
-    )
-    yield source_dir
-    if TEST_ROOT.exists():
-        shutil.rmtree(TEST_ROOT)
+    """Generate the test repository once, reusing it across pytest sessions.
+
+    The main repo records its submodule by absolute URL, so the repos are
+    generated in place in the cache and never moved. A lock file keeps
+    xdist workers from generating concurrently, and the ``.complete`` marker
+    is written last, so an interrupted run is regenerated next time.
+    """
+    cache_dir = _source_cache_dir()
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    source_dir = cache_dir / "source"
+    with open(cache_dir / ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if not (cache_dir / ".complete").exists():
+            subprocess.run(
+                [sys.executable, str(GENERATE_SCRIPT), "--out", str(source_dir)],
+                check=True,
+            )
+            (cache_dir / ".complete").touch()
+    return source_dir
+
+
+@pytest.fixture(scope="session")
+def cached_archive(test_repo, tmp_path_factory):
+    """Archive ``main_repo`` once; tests that only read an archive share it."""
+    archive_dir = tmp_path_factory.mktemp("archives", numbered=False)
+    result = _run_bundle("archive", f"file://{test_repo}/main_repo", "--out", str(archive_dir))
+    assert result.returncode == 0, f"Archive failed:\n{result.stderr}"
+    return next(archive_dir.glob("*.tar.zst"))
+
+
+@pytest.fixture(scope="session")
+def restored_repo(cached_archive, tmp_path_factory):
+    """Unpack ``cached_archive`` once; tests only inspect the restored repo."""
+    restore_dir = tmp_path_factory.mktemp("restored", numbered=False)
+    result = _run_bundle("unpack", str(cached_archive), "--dest", str(restore_dir))
+    assert result.returncode == 0, f"Unpack failed:\n{result.stderr}"
+    return restore_dir / "main_repo"
 
 
 def _run_bundle(*args: str) -> subprocess.CompletedProcess[str]:
-    """Helper to run git_bundle.py with given arguments."""
+    """Helper to run git_bundle's CLI in-process with given arguments.
+
+    Skips a Python interpreter start per call. Only output written through
+    ``sys.stdout``/``sys.stderr`` (i.e. our logging) is captured, not the
+    stderr of child git processes.
+    """
+    stdout, stderr = io.StringIO(), io.StringIO()
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        try:
+            returncode = bundle_main(list(args))
+        except SystemExit as e:  # argparse usage errors
+            returncode = e.code if isinstance(e.code, int) else 1
+    return subprocess.CompletedProcess(list(args), returncode, stdout.getvalue(), stderr.getvalue())
+
+
+def _run_bundle_cli(*args: str, capture: bool = True) -> subprocess.CompletedProcess[str]:
+    """Helper to run git_bundle.py as a standalone script with given arguments.
+
+    With ``capture=False`` the output is discarded instead of piped back and
+    decoded, for callers that only check the return code.
+    """
+    if not capture:
+        return subprocess.run(
+            [sys.executable, str(BUNDLE_SCRIPT), *args],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        )
     return subprocess.run(
         [sys.executable, str(BUNDLE_SCRIPT), *args],
         capture_output=True,
@@ -49,12 +129,17 @@ def _run_bundle(*args: str) -> subprocess.CompletedProcess[str]:
 # ---------------------------------------------------------------------------
 # Archive + Unpack roundtrip
 # ---------------------------------------------------------------------------
-@pytest.mark.parametrize("compression", ["gz", "zstd"])
+@pytest.mark.parametrize(
+    "compression",
+    [
+        "gz",
+        "zstd",
+        "none",
+        "dir",
+    ],
+)
 def test_archive_unpack_roundtrip(test_repo, compression, tmp_path):
     """Full archive -> unpack cycle for each compression format."""
-    if compression == "zstd" and not shutil.which("zstd"):
-        pytest.skip("zstd not installed")
-
     repo_url = f"file://{test_repo}/main_repo"
     archive_dir = tmp_path / "archive"
     archive_dir.mkdir()
@@ -64,8 +149,8 @@ def test_archive_unpack_roundtrip(test_repo, compression, tmp_path):
     result = _run_bundle("archive", repo_url, "--out", str(archive_dir), "--compress", compression)
     assert result.returncode == 0, f"Archive failed:\n{result.stderr}"
 
-    ext = "tar.zst" if compression == "zstd" else "tar.gz"
-    archives = list(archive_dir.glob(f"*.{ext}"))
+    pattern = {"gz": "*.tar.gz", "zstd": "*.tar.zst", "none": "*.tar", "dir": "*_*"}[compression]
+    archives = list(archive_dir.glob(pattern))
     assert len(archives) == 1, f"Expected 1 archive, found {len(archives)}"
 
     # Unpack
@@ -80,6 +165,54 @@ def test_archive_unpack_roundtrip(test_repo, compression, tmp_path):
     assert (restored_repo / "main_file.txt").exists(), "main_file.txt missing"
 
 
+def test_archive_multiple_repositories(test_repo, tmp_path):
+    """Several URLs in one invocation should each produce an archive."""
+    archive_dir = tmp_path / "archive"
+    archive_dir.mkdir()
+
+    result = _run_bundle(
+        "archive",
+        f"file://{test_repo}/main_repo",
+        f"file://{test_repo}/submodule_repo",
+        "--out",
+        str(archive_dir),
+    )
+    assert result.returncode == 0, f"Archive failed:\n{result.stderr}"
+
+    names = sorted(p.name.split("_2")[0] for p in archive_dir.glob("*.tar.zst"))
+    assert names == ["main_repo", "submodule_repo"]
+
+
+def test_archive_rejects_colliding_names(tmp_path):
+    """URLs sharing a basename would overwrite each other's archive."""
+    result = _run_bundle(
+        "archive",
+        "https://example.com/a/utils.git",
+        "https://example.com/b/utils.git",
+        "--out",
+        str(tmp_path),
+    )
+    assert result.returncode == 1
+    assert "share the archive name 'utils'" in result.stderr
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_archive_default_zstd_level(test_repo, tmp_path, monkeypatch):
+    """Without $GIT_BUNDLE_ZSTD_LEVEL (set to 1 by conftest), zstd runs at level 3.
+
+    Every test archive is compressed on all cores (``-T0``), whatever the level.
+    """
+    monkeypatch.delenv("GIT_BUNDLE_ZSTD_LEVEL")
+    archive_dir = tmp_path / "archive"
+    archive_dir.mkdir()
+
+    result = _run_bundle(
+        "-v", "archive", f"file://{test_repo}/main_repo", "--out", str(archive_dir)
+    )
+    assert result.returncode == 0, f"Archive failed:\n{result.stderr}"
+    assert "| zstd -q -c -3 -T0 " in result.stderr
+
+
 # ---------------------------------------------------------------------------
 # Archive with --verify
 # ---------------------------------------------------------------------------
@@ -97,17 +230,9 @@ def test_archive_with_verify(test_repo, tmp_path):
 # ---------------------------------------------------------------------------
 # Standalone verify
 # ---------------------------------------------------------------------------
-def test_standalone_verify(test_repo, tmp_path):
+def test_standalone_verify(cached_archive):
     """The verify subcommand should pass on a valid archive."""
-    repo_url = f"file://{test_repo}/main_repo"
-    archive_dir = tmp_path / "archive"
-    archive_dir.mkdir()
-
-    result = _run_bundle("archive", repo_url, "--out", str(archive_dir))
-    assert result.returncode == 0
-    archive_file = list(archive_dir.glob("*.tar.zst"))[0]
-
-    result = _run_bundle("verify", str(archive_file))
+    result = _run_bundle("verify", str(cached_archive))
     assert result.returncode == 0, f"Verify failed:\n{result.stderr}"
     assert "Verification passed" in result.stderr
 
@@ -115,18 +240,9 @@ def test_standalone_verify(test_repo, tmp_path):
 # ---------------------------------------------------------------------------
 # Submodule content preservation
 # ---------------------------------------------------------------------------
-def test_submodule_content_preserved(test_repo, tmp_path):
+def test_submodule_content_preserved(restored_repo):
     """Submodule files should exist after unpack."""
-    repo_url = f"file://{test_repo}/main_repo"
-    archive_dir = tmp_path / "archive"
-    archive_dir.mkdir()
-    restore_dir = tmp_path / "restore"
-
-    _run_bundle("archive", repo_url, "--out", str(archive_dir))
-    archive_file = list(archive_dir.glob("*.tar.zst"))[0]
-    _run_bundle("unpack", str(archive_file), "--dest", str(restore_dir))
-
-    sub_file = restore_dir / "main_repo" / "submodule_dir" / "sub_file.txt"
+    sub_file = restored_repo / "submodule_dir" / "sub_file.txt"
     assert sub_file.exists(), "Submodule file sub_file.txt missing after restore"
     assert sub_file.read_text() == "I am a submodule file."
 
@@ -134,21 +250,9 @@ def test_submodule_content_preserved(test_repo, tmp_path):
 # ---------------------------------------------------------------------------
 # LFS content preservation
 # ---------------------------------------------------------------------------
-def test_lfs_content_preserved(test_repo, tmp_path):
+def test_lfs_content_preserved(restored_repo):
     """LFS-tracked file should have correct size (1MB) after unpack."""
-    if not shutil.which("git-lfs"):
-        pytest.skip("git-lfs not installed")
-
-    repo_url = f"file://{test_repo}/main_repo"
-    archive_dir = tmp_path / "archive"
-    archive_dir.mkdir()
-    restore_dir = tmp_path / "restore"
-
-    _run_bundle("archive", repo_url, "--out", str(archive_dir))
-    archive_file = list(archive_dir.glob("*.tar.zst"))[0]
-    _run_bundle("unpack", str(archive_file), "--dest", str(restore_dir))
-
-    lfs_file = restore_dir / "main_repo" / "large_file.bin"
+    lfs_file = restored_repo / "large_file.bin"
     assert lfs_file.exists(), "LFS file large_file.bin missing"
     assert lfs_file.stat().st_size == 1024 * 1024, f"LFS file size wrong: {lfs_file.stat().st_size}"
 
@@ -156,50 +260,28 @@ def test_lfs_content_preserved(test_repo, tmp_path):
 # ---------------------------------------------------------------------------
 # Branch and tag preservation
 # ---------------------------------------------------------------------------
-def test_branch_preservation(test_repo, tmp_path):
-    """All branches should survive the archive -> unpack roundtrip."""
-    repo_url = f"file://{test_repo}/main_repo"
-    archive_dir = tmp_path / "archive"
-    archive_dir.mkdir()
-    restore_dir = tmp_path / "restore"
-
-    _run_bundle("archive", repo_url, "--out", str(archive_dir))
-    archive_file = list(archive_dir.glob("*.tar.zst"))[0]
-    result = _run_bundle("unpack", str(archive_file), "--dest", str(restore_dir))
-    assert result.returncode == 0
-
-    restored_repo = restore_dir / "main_repo"
-    branch_result = subprocess.run(
-        ["git", "branch", "-a"],
+@pytest.fixture(scope="session")
+def restored_refs(restored_repo):
+    """Every ref name in ``restored_repo``, listed by one ``git for-each-ref``."""
+    return subprocess.run(
+        ["git", "for-each-ref", "--format=%(refname)"],
         cwd=restored_repo,
         capture_output=True,
         text=True,
-    )
-    assert "feature/extra" in branch_result.stdout, (
-        f"Feature branch not found in:\n{branch_result.stdout}"
-    )
+        check=True,
+    ).stdout.splitlines()
 
 
-def test_tag_preservation(test_repo, tmp_path):
-    """Tagged releases should survive the archive -> unpack roundtrip."""
-    repo_url = f"file://{test_repo}/main_repo"
-    archive_dir = tmp_path / "archive"
-    archive_dir.mkdir()
-    restore_dir = tmp_path / "restore"
+def test_branch_preservation(restored_refs):
+    """All branches should survive the archive -> unpack roundtrip."""
+    assert "refs/remotes/origin/feature/extra" in restored_refs, (
+        f"Feature branch not found in:\n{restored_refs}"
+    )
 
-    _run_bundle("archive", repo_url, "--out", str(archive_dir))
-    archive_file = list(archive_dir.glob("*.tar.zst"))[0]
-    result = _run_bundle("unpack", str(archive_file), "--dest", str(restore_dir))
-    assert result.returncode == 0
 
-    restored_repo = restore_dir / "main_repo"
-    tag_result = subprocess.run(
-        ["git", "tag"],
-        cwd=restored_repo,
-        capture_output=True,
-        text=True,
-    )
-    assert "v1.0.0" in tag_result.stdout, f"Tag v1.0.0 not found in:\n{tag_result.stdout}"
+def test_tag_preservation(restored_refs):
+    """Tagged releases should survive the archive -> unpack roundtrip."""
+    assert "refs/tags/v1.0.0" in restored_refs, f"Tag v1.0.0 not found in:\n{restored_refs}"
 
 
 # ---------------------------------------------------------------------------
@@ -207,30 +289,14 @@ def test_tag_preservation(test_repo, tmp_path):
 # ---------------------------------------------------------------------------
 def test_simple_repo_roundtrip(tmp_path):
     """Archive/unpack should work for a minimal repo without LFS or submodules."""
-    # Create a minimal repo
+    # Create a minimal repo; the identity is passed per command, not written to config
     simple_repo = tmp_path / "simple"
     simple_repo.mkdir()
-    subprocess.run(["git", "init"], cwd=simple_repo, check=True, capture_output=True)
-    subprocess.run(
-        ["git", "config", "user.email", "test@test.com"],
-        cwd=simple_repo,
-        check=True,
-        capture_output=True,
-    )
-    subprocess.run(
-        ["git", "config", "user.name", "Test"],
-        cwd=simple_repo,
-        check=True,
-        capture_output=True,
-    )
+    git = ["git", "-c", "user.name=Test", "-c", "user.email=test@test.com"]
+    subprocess.run(["git", "init", "-q"], cwd=simple_repo, check=True)
     (simple_repo / "hello.txt").write_text("hello world")
-    subprocess.run(["git", "add", "."], cwd=simple_repo, check=True, capture_output=True)
-    subprocess.run(
-        ["git", "commit", "-m", "init"],
-        cwd=simple_repo,
-        check=True,
-        capture_output=True,
-    )
+    subprocess.run(["git", "add", "."], cwd=simple_repo, check=True)
+    subprocess.run([*git, "commit", "-qm", "init"], cwd=simple_repo, check=True)
 
     repo_url = f"file://{simple_repo}"
     archive_dir = tmp_path / "archive"
@@ -251,22 +317,33 @@ def test_simple_repo_roundtrip(tmp_path):
 # ---------------------------------------------------------------------------
 # Corrupted archive
 # ---------------------------------------------------------------------------
-def test_corrupted_archive(test_repo, tmp_path):
+@pytest.fixture(scope="session")
+def truncated_archive(cached_archive, tmp_path_factory):
+    """The first quarter of ``cached_archive``, written once for the corruption tests."""
+    corrupted = tmp_path_factory.mktemp("corrupted", numbered=False) / "corrupted.tar.zst"
+    with open(cached_archive, "rb") as src, open(corrupted, "wb") as dst:
+        remaining = os.fstat(src.fileno()).st_size // 4
+        if sys.platform == "linux":
+            # Copy the prefix in the kernel rather than reading the archive into memory
+            while remaining > 0:
+                remaining -= os.sendfile(dst.fileno(), src.fileno(), None, remaining)
+        else:
+            dst.write(src.read(remaining))
+    return corrupted
+
+
+def test_corrupted_archive(truncated_archive, tmp_path):
     """A truncated archive should fail with a clear error."""
-    repo_url = f"file://{test_repo}/main_repo"
-    archive_dir = tmp_path / "archive"
-    archive_dir.mkdir()
-
-    _run_bundle("archive", repo_url, "--out", str(archive_dir))
-    archive_file = list(archive_dir.glob("*.tar.zst"))[0]
+    result = _run_bundle_cli(
+        "unpack", str(truncated_archive), "--dest", str(tmp_path / "restore"), capture=False
+    )
+    assert result.returncode != 0, "Unpacking corrupted archive should fail"
 
-    # Truncate the archive to corrupt it
-    corrupted = tmp_path / "corrupted.tar.gz"
-    data = archive_file.read_bytes()
-    corrupted.write_bytes(data[: len(data) // 4])
 
-    result = _run_bundle("unpack", str(corrupted))
-    assert result.returncode != 0, "Unpacking corrupted archive should fail"
+def test_verify_corrupted_archive(truncated_archive):
+    """Verifying a truncated archive should fail."""
+    result = _run_bundle("verify", str(truncated_archive))
+    assert result.returncode != 0, "Verifying corrupted archive should fail"
 
 
 # ---------------------------------------------------------------------------
@@ -274,6 +351,6 @@ def test_corrupted_archive(test_repo, tmp_path):
 # ---------------------------------------------------------------------------
 def test_unpack_nonexistent_archive():
     """Unpacking a nonexistent file should fail with a clear error."""
-    result = _run_bundle("unpack", "/tmp/does_not_exist_12345.tar.gz")
+    result = _run_bundle_cli("unpack", "/tmp/does_not_exist_12345.tar.gz")
     assert result.returncode != 0
     assert "Archive not found" in result.stdout or "Archive not found" in result.stderr
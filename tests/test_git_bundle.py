@@ -1,93 +1,307 @@
 """Unit tests for git_bundle module.
 
-All tests use pytest with pytest-mock. No filesystem or network access.
+All tests use pytest. Plain stubs go through ``monkeypatch``; pytest-mock is
+used where a test inspects how a mock was called. No network access;
+filesystem access is limited to pytest's ``tmp_path``.
 """
 
+import contextlib
+import errno
+import hashlib
 import json
+import logging
+import os
+import shutil
 import subprocess
+import sys
+import threading
 from pathlib import Path
-from unittest.mock import MagicMock, mock_open
+from typing import Any
 
 import pytest
 
 from git_bundle import (
+    INDEX_PACK_THREADS,
+    PIPE_BUFFER_SIZE,
+    TAR_BLOCKING_FACTOR,
     GitArchiver,
     GitBundlerError,
+    GitCatFile,
     GitUnpacker,
     GitVerifier,
+    _grow_pipe,
     check_dependency,
-    parse_git_config,
+    copy_file_fast,
+    copy_tree_fast,
+    main,
+    parse_gitmodules,
+    resolve_jobs,
     run_command,
+    run_pipeline,
 )
 
+
+def _cp(
+    returncode: int = 0, stdout: str | None = "", stderr: str | None = ""
+) -> subprocess.CompletedProcess[str]:
+    """Build the ``CompletedProcess`` a mocked command returns."""
+    return subprocess.CompletedProcess([], returncode, stdout, stderr)
+
+
+def _noop(*args: Any, **kwargs: Any) -> None:
+    """Stand-in for filesystem calls whose effect a test doesn't need."""
+
+
+def _patch_all(monkeypatch: pytest.MonkeyPatch, targets: dict[str, Any]) -> None:
+    """``monkeypatch.setattr`` each ``"module.attribute"`` in ``targets`` to its value."""
+    for target, value in targets.items():
+        monkeypatch.setattr(target, value)
+
+
+@pytest.fixture(autouse=True, scope="module")
+def _no_dependency_checks():
+    """Skip the ``PATH`` lookups for git, git-lfs, tar, and zstd; no test runs them."""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr("git_bundle.check_dependency", _noop)
+        yield
+
+
+class _StagingDirs:
+    """``tempfile.TemporaryDirectory`` stand-in that yields ``path`` without creating it.
+
+    The ``dir`` each staging directory was requested under is recorded in ``parents``.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.parents: list[Path | None] = []
+
+    def __call__(self, **kwargs: Any) -> contextlib.nullcontext[str]:
+        self.parents.append(kwargs.get("dir"))
+        return contextlib.nullcontext(self.path)
+
+
+class _CatFile(dict):
+    """``GitCatFile`` stand-in serving the blobs it maps object names to.
+
+    Patch an instance over ``git_bundle.GitCatFile``; every ``read`` is
+    recorded in ``reads``, and names it does not hold read as missing.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.reads: list[str] = []
+
+    def __call__(self, repo_path: Path, verbose: bool = True) -> "_CatFile":
+        return self
+
+    def __enter__(self) -> "_CatFile":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        pass
+
+    def read(self, spec: str) -> bytes | None:
+        self.reads.append(spec)
+        return self.get(spec)
+
+
+class _ListHandler(logging.Handler):
+    """Logging handler that keeps each formatted message in ``messages``."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.messages: list[str] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.messages.append(record.getMessage())
+
+
+# Paths handed to code whose filesystem access is mocked or never reached.
+_FAKE_REPO = Path("/fake/repo.git")
+_FAKE_TEMP = Path("/fake/temp")
+_FAKE_ARCHIVE = Path("/fake/archive.tar.gz")
+_GITMODULES = "HEAD:.gitmodules"
+
+
 # ---------------------------------------------------------------------------
 # run_command
 # ---------------------------------------------------------------------------
 
 
 class TestRunCommand:
-    def test_success(self, mocker):
-        mock_run = mocker.patch("subprocess.run")
-        mock_run.return_value = MagicMock(
-            returncode=0, stdout="hello", stderr="", spec=subprocess.CompletedProcess
-        )
+    def test_success(self, monkeypatch):
+        monkeypatch.setattr("subprocess.run", lambda *a, **kw: _cp(stdout="hello"))
         result = run_command(["echo", "hello"], cwd=Path("."), verbose=False)
         assert result.returncode == 0
         assert result.stdout == "hello"
 
-    def test_failure_raises(self, mocker):
-        mock_run = mocker.patch("subprocess.run")
-        mock_run.return_value = MagicMock(
-            returncode=1, stdout="", stderr="bad command", spec=subprocess.CompletedProcess
-        )
+    def test_failure_raises(self, monkeypatch):
+        monkeypatch.setattr("subprocess.run", lambda *a, **kw: _cp(1, stderr="bad command"))
         with pytest.raises(GitBundlerError, match="Command failed"):
             run_command(["false"], cwd=Path("."), verbose=False)
 
-    def test_failure_includes_stderr_in_error(self, mocker):
-        mock_run = mocker.patch("subprocess.run")
-        mock_run.return_value = MagicMock(
-            returncode=1, stdout="", stderr="specific error msg", spec=subprocess.CompletedProcess
-        )
+    def test_failure_includes_stderr_in_error(self, monkeypatch):
+        monkeypatch.setattr("subprocess.run", lambda *a, **kw: _cp(1, stderr="specific error msg"))
         with pytest.raises(GitBundlerError, match="specific error msg"):
-            run_command(["fail"], cwd=Path("."), verbose=False)
+            run_command(["false"], cwd=Path("."), verbose=False)
 
-    def test_failure_ignore_errors(self, mocker):
-        mock_run = mocker.patch("subprocess.run")
-        mock_run.return_value = MagicMock(
-            returncode=1, stdout="", stderr="ignored", spec=subprocess.CompletedProcess
-        )
+    def test_failure_ignore_errors(self, monkeypatch):
+        monkeypatch.setattr("subprocess.run", lambda *a, **kw: _cp(1, stderr="ignored"))
         result = run_command(["false"], cwd=Path("."), verbose=False, ignore_errors=True)
         assert result.returncode == 1
 
     def test_no_capture_output(self, mocker):
         mock_run = mocker.patch("subprocess.run")
-        mock_run.return_value = MagicMock(
-            returncode=0, stdout=None, stderr=None, spec=subprocess.CompletedProcess
-        )
+        mock_run.return_value = _cp(stdout=None, stderr=None)
         run_command(["ls"], cwd=Path("."), verbose=False, capture_output=False)
         call_kwargs = mock_run.call_args[1]
         assert call_kwargs["stdout"] is None
         assert call_kwargs["stderr"] is None
 
-    def test_verbose_logging(self, mocker, caplog):
-        import logging
+    def test_discard_stdout_keeps_stderr(self, mocker):
+        mock_run = mocker.patch("subprocess.run")
+        mock_run.return_value = _cp(stdout=None)
+        run_command(["git", "fsck"], cwd=Path("."), verbose=False, discard_stdout=True)
+        call_kwargs = mock_run.call_args[1]
+        assert call_kwargs["stdout"] is subprocess.DEVNULL
+        assert call_kwargs["stderr"] is subprocess.PIPE
 
+    def test_spawns_resolved_executable(self, mocker):
+        mocker.patch("git_bundle._executable", return_value="/usr/bin/git")
         mock_run = mocker.patch("subprocess.run")
-        mock_run.return_value = MagicMock(
-            returncode=0, stdout="", stderr="", spec=subprocess.CompletedProcess
-        )
-        with caplog.at_level(logging.DEBUG):
+        mock_run.return_value = _cp()
+        run_command(["git", "status"], cwd=Path("."), verbose=False)
+        assert mock_run.call_args[0][0] == ["git", "status"]
+        call_kwargs = mock_run.call_args[1]
+        assert call_kwargs["executable"] == "/usr/bin/git"
+        assert call_kwargs["close_fds"] is False
+
+    def test_missing_executable_not_cached(self, monkeypatch):
+        monkeypatch.setattr("shutil.which", lambda name: None)
+        with pytest.raises(GitBundlerError, match="not installed"):
+            run_command(["late-tool"], cwd=Path("."), verbose=False)
+
+        monkeypatch.setattr("shutil.which", lambda name: f"/usr/bin/{name}")
+        monkeypatch.setattr("subprocess.run", lambda *a, **kw: _cp())
+        assert run_command(["late-tool"], cwd=Path("."), verbose=False).returncode == 0
+
+    def test_verbose_logging(self, monkeypatch):
+        monkeypatch.setattr("subprocess.run", lambda *a, **kw: _cp())
+        handler = _ListHandler()
+        logger = logging.getLogger("git_bundle")
+        level = logger.level
+        logger.addHandler(handler)
+        logger.setLevel(logging.DEBUG)
+        try:
             run_command(["git", "status"], cwd=Path("."), verbose=True)
-        assert "[CMD] git status" in caplog.text
+        finally:
+            logger.removeHandler(handler)
+            logger.setLevel(level)
+        assert any("[CMD] git status" in message for message in handler.messages)
 
-    def test_failure_no_stderr(self, mocker):
+    def test_failure_no_stderr(self, monkeypatch):
         """When stderr is empty, error message should still be clear."""
-        mock_run = mocker.patch("subprocess.run")
-        mock_run.return_value = MagicMock(
-            returncode=1, stdout="", stderr="", spec=subprocess.CompletedProcess
-        )
+        monkeypatch.setattr("subprocess.run", lambda *a, **kw: _cp(1))
         with pytest.raises(GitBundlerError, match="Command failed"):
-            run_command(["fail"], cwd=Path("."), verbose=False)
+            run_command(["false"], cwd=Path("."), verbose=False)
+
+
+# ---------------------------------------------------------------------------
+# run_pipeline
+# ---------------------------------------------------------------------------
+
+
+class TestRunPipeline:
+    def test_streams_producer_through_consumer(self, tmp_path):
+        out = tmp_path / "out.txt"
+        run_pipeline(
+            [sys.executable, "-c", "print('hello')"],
+            [sys.executable, "-c", "import sys; sys.stdout.write(sys.stdin.read().upper())"],
+            cwd=tmp_path,
+            output_file=out,
+            verbose=False,
+        )
+        assert out.read_text().strip() == "HELLO"
+
+    @pytest.mark.skipif(sys.platform != "linux", reason="F_SETPIPE_SZ is Linux-only")
+    def test_grow_pipe(self):
+        import fcntl
+        import os
+
+        read_fd, write_fd = os.pipe()
+        try:
+            _grow_pipe(write_fd)
+            assert fcntl.fcntl(write_fd, fcntl.F_GETPIPE_SZ) == PIPE_BUFFER_SIZE
+        finally:
+            os.close(read_fd)
+            os.close(write_fd)
+
+    @pytest.mark.skipif(sys.platform != "linux", reason="F_SETPIPE_SZ is Linux-only")
+    def test_consumer_reads_from_grown_pipe(self, tmp_path):
+        out = tmp_path / "out.txt"
+        run_pipeline(
+            [sys.executable, "-c", "pass"],
+            [sys.executable, "-c", "import fcntl; print(fcntl.fcntl(0, fcntl.F_GETPIPE_SZ))"],
+            cwd=tmp_path,
+            output_file=out,
+            verbose=False,
+        )
+        assert int(out.read_text()) == PIPE_BUFFER_SIZE
+
+    def test_producer_failure_raises(self, tmp_path):
+        with pytest.raises(GitBundlerError, match="producer broke"):
+            run_pipeline(
+                [sys.executable, "-c", "import sys; sys.exit('producer broke')"],
+                [sys.executable, "-c", "import sys; sys.stdin.read()"],
+                cwd=tmp_path,
+                output_file=tmp_path / "out",
+                verbose=False,
+            )
+
+    def test_consumer_failure_raises(self, tmp_path):
+        with pytest.raises(GitBundlerError, match="consumer broke"):
+            run_pipeline(
+                [sys.executable, "-c", "print('data')"],
+                [sys.executable, "-c", "import sys; sys.exit('consumer broke')"],
+                cwd=tmp_path,
+                output_file=tmp_path / "out",
+                verbose=False,
+            )
+
+
+# ---------------------------------------------------------------------------
+# copy_file_fast / copy_tree_fast
+# ---------------------------------------------------------------------------
+
+
+class TestFastCopy:
+    def test_copy_file(self, tmp_path):
+        src = tmp_path / "src.bin"
+        src.write_bytes(b"x" * 100_000)
+        copy_file_fast(src, tmp_path / "dst.bin")
+        assert (tmp_path / "dst.bin").read_bytes() == src.read_bytes()
+
+    def test_falls_back_when_kernel_copy_unsupported(self, tmp_path, mocker):
+        src = tmp_path / "src.bin"
+        src.write_bytes(b"payload")
+        mocker.patch("fcntl.ioctl", side_effect=OSError(errno.EOPNOTSUPP, "no reflink"))
+        mocker.patch("os.copy_file_range", side_effect=OSError(errno.EXDEV, "cross-device"))
+        copyfile = mocker.patch("shutil.copyfile")
+
+        copy_file_fast(src, tmp_path / "dst.bin")
+
+        copyfile.assert_called_once_with(src, tmp_path / "dst.bin")
+
+    def test_copy_tree(self, tmp_path):
+        src = tmp_path / "objects"
+        (src / "ab" / "cd").mkdir(parents=True)
+        (src / "ab" / "cd" / "abcd1234").write_bytes(b"lfs object")
+        dst = tmp_path / "restored" / "objects"
+
+        copy_tree_fast(src, dst)
+
+        assert (dst / "ab" / "cd" / "abcd1234").read_bytes() == b"lfs object"
 
 
 # ---------------------------------------------------------------------------
@@ -96,97 +310,173 @@ class TestRunCommand:
 
 
 class TestCheckDependency:
-    def test_exists(self, mocker):
-        mocker.patch("shutil.which", return_value="/usr/bin/git")
+    @pytest.fixture(autouse=True)
+    def _clear_cache(self):
+        check_dependency.cache_clear()
+        yield
+        check_dependency.cache_clear()
+
+    def test_exists(self, monkeypatch):
+        monkeypatch.setattr("shutil.which", lambda _: "/usr/bin/git")
         check_dependency("git")  # Should not raise
 
-    def test_missing(self, mocker):
-        mocker.patch("shutil.which", return_value=None)
+    def test_missing(self, monkeypatch):
+        monkeypatch.setattr("shutil.which", lambda _: None)
         with pytest.raises(GitBundlerError, match="nonexistent_tool"):
             check_dependency("nonexistent_tool")
 
+    def test_found_tool_is_cached(self, mocker):
+        which = mocker.patch("shutil.which", return_value="/usr/bin/git")
+        check_dependency("git")
+        check_dependency("git")
+        which.assert_called_once_with("git")
+
 
 # ---------------------------------------------------------------------------
-# parse_git_config
+# resolve_jobs
 # ---------------------------------------------------------------------------
 
-SAMPLE_CONFIG = (
-    "submodule.lib.path=libs/lib\n"
-    "submodule.lib.url=https://example.com/lib.git\n"
-    "submodule.vendor.path=vendor/pkg\n"
-    "submodule.vendor.url=../vendor.git\n"
-)
 
+class TestResolveJobs:
+    def test_default_uses_cpu_count(self, monkeypatch):
+        monkeypatch.setattr("os.cpu_count", lambda: 4)
+        assert resolve_jobs(None, 10) == 4
 
-class TestParseGitConfig:
-    def test_submodule_urls(self):
-        result = parse_git_config(SAMPLE_CONFIG, "submodule", "url")
-        assert result == {
-            "lib": "https://example.com/lib.git",
-            "vendor": "../vendor.git",
-        }
+    def test_capped_at_task_count(self):
+        assert resolve_jobs(8, 3) == 3
 
-    def test_submodule_paths(self):
-        result = parse_git_config(SAMPLE_CONFIG, "submodule", "path")
-        assert result == {
-            "lib": "libs/lib",
-            "vendor": "vendor/pkg",
-        }
+    def test_zero_is_unlimited(self):
+        assert resolve_jobs(0, 12) == 12
 
-    def test_empty_config(self):
-        assert parse_git_config("", "submodule", "url") == {}
+    def test_never_below_one(self):
+        assert resolve_jobs(0, 0) == 1
+        assert resolve_jobs(4, 0) == 1
 
-    def test_no_matching_section(self):
-        assert parse_git_config(SAMPLE_CONFIG, "remote", "url") == {}
 
-    def test_lines_without_equals(self):
-        config = "malformed line\nsubmodule.x.url=ok\n"
-        result = parse_git_config(config, "submodule", "url")
-        assert result == {"x": "ok"}
+# ---------------------------------------------------------------------------
+# parse_gitmodules
+# ---------------------------------------------------------------------------
 
-    def test_value_with_equals_sign(self):
-        """URLs with query params containing = should be preserved."""
-        config = "submodule.api.url=https://host.com/repo?token=abc123\n"
-        result = parse_git_config(config, "submodule", "url")
-        assert result == {"api": "https://host.com/repo?token=abc123"}
 
-    def test_multiple_dots_in_name(self):
-        """Config keys with extra dots should still match."""
-        config = "submodule.my.lib.url=https://example.com/lib.git\n"
-        result = parse_git_config(config, "submodule", "url")
-        # parts = ["submodule", "my", "lib", "url"] — parts[2] != "url" for 3-part keys
-        # This tests that the parser handles >3 segments — currently it only matches parts[2]
-        # so "my.lib" would have parts[2]="lib" != "url", meaning it won't match.
-        # This documents the current behavior.
-        assert result == {}
+class TestParseGitmodules:
+    @pytest.mark.parametrize(
+        "data, expected",
+        [
+            pytest.param(
+                b"# managed by hand\n"
+                b'[submodule "lib"]\n\tpath = libs/lib\n\turl = https://example.com/lib.git\n'
+                b'[submodule "vendor"]\n\tpath = vendor/pkg\n\turl = ../vendor.git\n',
+                {
+                    "lib": {"path": "libs/lib", "url": "https://example.com/lib.git"},
+                    "vendor": {"path": "vendor/pkg", "url": "../vendor.git"},
+                },
+                id="submodule-settings",
+            ),
+            # Quoted values, percent-escapes, mixed-case keys and dotted names
+            pytest.param(
+                b'[submodule "a.b"]\n\tURL = "https://host/my%20repo.git"\n',
+                {"a.b": {"url": "https://host/my%20repo.git"}},
+                id="git-value-syntax",
+            ),
+            # URLs with query params containing = should be preserved
+            pytest.param(
+                b'[submodule "api"]\n\turl = https://host.com/repo?token=abc123\n',
+                {"api": {"url": "https://host.com/repo?token=abc123"}},
+                id="value-with-equals-sign",
+            ),
+            pytest.param(b"[core]\n\tbare = true\n", {}, id="other-sections-ignored"),
+            pytest.param(
+                b'[submodule "a"]\n\turl = ../b.git ; comment\n\tpath = a # comment\n',
+                {"a": {"url": "../b.git", "path": "a"}},
+                id="inline-comments",
+            ),
+            pytest.param(
+                b'[submodule "a"]\n\turl = "../a;b.git" # c\n\tbranch = "x\\"y"\n',
+                {"a": {"url": "../a;b.git", "branch": 'x"y'}},
+                id="quoted-comment-chars-and-escapes",
+            ),
+            # Deeper indentation is not a continuation line in git config
+            pytest.param(
+                b'[submodule "a"]\n  path = a\n\t\turl = ../a.git\n',
+                {"a": {"path": "a", "url": "../a.git"}},
+                id="uneven-indentation",
+            ),
+            pytest.param(
+                b'[submodule "a"]\n\tactive\n\tpath = a\n\turl = ../a.git\n',
+                {"a": {"active": "true", "path": "a", "url": "../a.git"}},
+                id="bare-boolean",
+            ),
+        ],
+    )
+    def test_parse(self, data, expected):
+        assert parse_gitmodules(data) == expected
+
+    @pytest.mark.parametrize(
+        "data",
+        [
+            pytest.param(b"path = no section\n", id="no-section"),
+            # git config has no ":" delimiter
+            pytest.param(b'[submodule "a"]\n\tpath: a\n', id="colon-delimiter"),
+        ],
+    )
+    def test_invalid_syntax_raises(self, data):
+        with pytest.raises(GitBundlerError, match=".gitmodules"):
+            parse_gitmodules(data)
 
 
 # ---------------------------------------------------------------------------
-# GitArchiver._extract_repo_name
+# GitCatFile
 # ---------------------------------------------------------------------------
 
 
-class TestExtractRepoName:
-    def test_url_with_git_suffix(self):
-        assert GitArchiver._extract_repo_name("https://github.com/user/repo.git") == "repo"
-
-    def test_url_without_suffix(self):
-        assert GitArchiver._extract_repo_name("https://github.com/user/repo") == "repo"
-
-    def test_url_trailing_slash(self):
-        assert GitArchiver._extract_repo_name("https://github.com/user/repo/") == "repo"
+class TestGitCatFile:
+    @pytest.fixture()
+    def repo(self, tmp_path):
+        git = ["git", "-c", "user.name=Test", "-c", "user.email=test@test.com"]
+        subprocess.run(["git", "init", "-q"], cwd=tmp_path, check=True)
+        (tmp_path / "a.txt").write_text("alpha\n")
+        (tmp_path / "b.txt").write_bytes(b"beta\x00binary")
+        subprocess.run(["git", "add", "."], cwd=tmp_path, check=True)
+        subprocess.run([*git, "commit", "-qm", "init"], cwd=tmp_path, check=True)
+        return tmp_path
+
+    def test_reads_multiple_blobs_in_one_session(self, repo):
+        with GitCatFile(repo, verbose=False) as cat:
+            assert cat.read("HEAD:a.txt") == b"alpha\n"
+            assert cat.read("HEAD:b.txt") == b"beta\x00binary"
+
+    def test_missing_object_returns_none(self, repo):
+        with GitCatFile(repo, verbose=False) as cat:
+            assert cat.read("HEAD:.gitmodules") is None
+            assert cat.read("HEAD:a.txt") == b"alpha\n"
+
+    def test_read_outside_context_raises(self, repo):
+        with pytest.raises(GitBundlerError, match="outside its context"):
+            GitCatFile(repo).read("HEAD:a.txt")
 
-    def test_local_path(self):
-        assert GitArchiver._extract_repo_name("/home/user/repo.git") == "repo"
 
-    def test_bare_name(self):
-        assert GitArchiver._extract_repo_name("repo.git") == "repo"
+# ---------------------------------------------------------------------------
+# GitArchiver._extract_repo_name
+# ---------------------------------------------------------------------------
 
-    def test_ssh_url(self):
-        assert GitArchiver._extract_repo_name("git@github.com:user/repo.git") == "repo"
 
-    def test_ssh_url_no_suffix(self):
-        assert GitArchiver._extract_repo_name("git@gitlab.com:org/project") == "project"
+class TestExtractRepoName:
+    @pytest.mark.parametrize(
+        "url, expected",
+        [
+            ("https://github.com/user/repo.git", "repo"),
+            ("https://github.com/user/repo", "repo"),
+            ("https://github.com/user/repo/", "repo"),
+            ("/home/user/repo.git", "repo"),
+            ("repo.git", "repo"),
+            ("git@github.com:user/repo.git", "repo"),
+            ("git@gitlab.com:org/project", "project"),
+            ("file:///srv/git/repo.git/", "repo"),
+            ("https://host/user/repo.git?ref=main#x", "repo"),
+        ],
+    )
+    def test_extract_repo_name(self, url, expected):
+        assert GitArchiver._extract_repo_name(url) == expected
 
 
 # ---------------------------------------------------------------------------
@@ -195,21 +485,17 @@ class TestExtractRepoName:
 
 
 class TestResolveRelativeUrl:
-    def test_absolute_url(self):
-        result = GitArchiver._resolve_relative_url(
-            "https://github.com/user/repo.git", "https://example.com/lib.git"
-        )
-        assert result == "https://example.com/lib.git"
-
-    def test_dotdot_relative(self):
-        result = GitArchiver._resolve_relative_url("https://github.com/user/repo.git", "../lib.git")
-        assert result == "https://github.com/user/lib.git"
-
-    def test_dot_relative(self):
-        result = GitArchiver._resolve_relative_url(
-            "https://github.com/user/repo.git", "./sibling.git"
-        )
-        assert result == "https://github.com/user/repo.git/sibling.git"
+    @pytest.mark.parametrize(
+        "sub_url, expected",
+        [
+            ("https://example.com/lib.git", "https://example.com/lib.git"),
+            ("../lib.git", "https://github.com/user/lib.git"),
+            ("./sibling.git", "https://github.com/user/repo.git/sibling.git"),
+        ],
+    )
+    def test_resolve_relative_url(self, sub_url, expected):
+        parent = "https://github.com/user/repo.git"
+        assert GitArchiver._resolve_relative_url(parent, sub_url) == expected
 
 
 # ---------------------------------------------------------------------------
@@ -217,52 +503,292 @@ class TestResolveRelativeUrl:
 # ---------------------------------------------------------------------------
 
 
-class TestGitArchiverFlow:
-    @pytest.fixture()
-    def archiver(self, mocker):
-        mocker.patch("git_bundle.check_dependency")
-        return GitArchiver("https://github.com/user/repo.git", Path("/tmp"))
+@pytest.fixture(scope="module")
+def shared_archiver():
+    """One ``GitArchiver`` for every test that only calls into it."""
+    return GitArchiver("https://github.com/user/repo.git", Path("/tmp"))
 
-    def test_archive_flow_gz(self, archiver, mocker):
-        mock_run = mocker.patch("git_bundle.run_command")
-        mocker.patch("tempfile.TemporaryDirectory")
-        mocker.patch("pathlib.Path.mkdir")
-        mocker.patch("pathlib.Path.write_text")
-        mocker.patch("builtins.open", mock_open())
 
-        mock_temp = mocker.patch("tempfile.TemporaryDirectory")
-        mock_temp.return_value.__enter__.return_value = "/mock/temp"
-        mock_run.return_value = MagicMock(returncode=0, stdout="", spec=subprocess.CompletedProcess)
+class TestGitArchiverFlow:
+    @pytest.fixture()
+    def archiver(self, shared_archiver, monkeypatch):
+        monkeypatch.setattr("git_bundle.GitCatFile", _CatFile())  # no .gitmodules
+        monkeypatch.setattr("git_bundle.sha256_file", lambda path: "0" * 64)
+        return shared_archiver
+
+    def test_archive_flow_gz(self, archiver, monkeypatch, run_cmd):
+        _patch_all(
+            monkeypatch,
+            {
+                "tempfile.TemporaryDirectory": _StagingDirs("/mock/temp"),
+                "pathlib.Path.mkdir": _noop,
+                "pathlib.Path.write_text": _noop,
+            },
+        )
 
         output_file = archiver.archive(compression="gz")
 
         # Verify clone --mirror was called
-        assert any(
-            "clone" in c.args[0] and "--mirror" in c.args[0] for c in mock_run.call_args_list
-        )
+        assert run_cmd.ran("clone", "--mirror")
         # Verify LFS fetch
-        assert any("lfs" in c.args[0] and "fetch" in c.args[0] for c in mock_run.call_args_list)
+        assert run_cmd.ran("lfs", "fetch")
         # Verify gz compression
-        assert any("tar" in c.args[0] and "-czf" in c.args[0] for c in mock_run.call_args_list)
+        assert run_cmd.ran("tar", "-czf")
         assert output_file.endswith(".tar.gz")
 
-    def test_archive_flow_zstd(self, archiver, mocker):
-        mock_run = mocker.patch("git_bundle.run_command")
-        mocker.patch("pathlib.Path.write_text")
-        mocker.patch("builtins.open", mock_open())
+    def test_lfs_fetch_concurrency(self, run_cmd):
+        archiver = GitArchiver("https://github.com/user/repo.git", Path("/tmp"), lfs_transfers=16)
+
+        archiver._handle_lfs(_FAKE_REPO)
+
+        (cmd,) = run_cmd.cmds
+        assert cmd[:3] == ("git", "-c", "lfs.concurrenttransfers=16")
+        assert cmd[3:] == ("lfs", "fetch", "--all")
+
+    def test_reference_cache_seeded_then_borrowed(self, run_cmd, tmp_path):
+        archiver = GitArchiver("https://x/repo.git", Path("/tmp"), reference_cache=tmp_path)
+        cache = tmp_path / "repo.git"
+
+        used = archiver._clone_mirror("https://x/repo.git", Path("/work/repo.git"), cache)
+
+        assert used == cache
+        seed, clone = run_cmd.cmds
+        assert seed[-4:] == ("clone", "--mirror", "https://x/repo.git", str(cache))
+        assert clone[:3] == ("git", "-c", f"pack.threads={INDEX_PACK_THREADS}")
+        assert clone[5:8] == ("--reference-if-able", str(cache), "--dissociate")
+        assert "--template=" in clone
+
+    def test_reference_cache_refreshed_when_present(self, run_cmd, tmp_path):
+        archiver = GitArchiver("https://x/repo.git", Path("/tmp"), reference_cache=tmp_path)
+        cache = tmp_path / "repo.git"
+        cache.mkdir()
+        run_cmd.results["config"] = _cp(stdout="https://x/repo.git\n")
+
+        archiver._clone_mirror("https://x/repo.git", Path("/work/repo.git"), cache)
+
+        cmd, kwargs = run_cmd.calls[1]
+        assert cmd == ("git", "remote", "update", "--prune")
+        assert kwargs["cwd"] == cache
+        assert run_cmd.ran("--reference-if-able", str(cache))
+
+    def test_reference_cache_of_other_url_not_used(self, run_cmd, tmp_path):
+        archiver = GitArchiver("https://x/repo.git", Path("/tmp"), reference_cache=tmp_path)
+        cache = tmp_path / "repo.git"
+        cache.mkdir()
+        run_cmd.results["config"] = _cp(stdout="https://y/repo.git\n")
+
+        used = archiver._clone_mirror("https://x/repo.git", Path("/work/repo.git"), cache)
+
+        assert used is None
+        assert not run_cmd.ran("remote", "update")
+        assert not run_cmd.ran("--reference-if-able")
+
+    def test_reference_mirror_locked_while_refreshed(self, run_cmd, monkeypatch, tmp_path):
+        """Archivers running side by side may share a submodule's mirror."""
+        archiver = GitArchiver("https://x/repo.git", Path("/tmp"), reference_cache=tmp_path)
+        cache = tmp_path / "lib.git"
+        held = []
+
+        def refresh(url, cache):
+            held.append(GitArchiver._reference_locks[cache].locked())
+            return True
+
+        monkeypatch.setattr(archiver, "_refresh_reference", refresh)
+
+        archiver._clone_mirror("https://x/lib.git", tmp_path / "work" / "lib.git", cache)
+
+        assert held == [True]
+        assert not GitArchiver._reference_locks[cache].locked()
+
+    def test_reference_path_keyed_by_url(self, tmp_path):
+        archiver = GitArchiver("https://x/a/utils.git", Path("/tmp"), reference_cache=tmp_path)
+
+        a = archiver._reference_path("https://x/a/utils.git")
+        b = archiver._reference_path("https://x/b/utils.git")
+
+        assert a is not None and b is not None
+        assert a != b
+        assert a.parent == b.parent == tmp_path
+        assert a.name.startswith("utils-")
+        assert archiver._reference_path("https://x/a/utils.git") == a
+
+    def test_clone_mirror_creates_missing_parent(self, run_cmd, shared_archiver, tmp_path):
+        dest = tmp_path / "submodules" / "libs" / "lib.git"
+
+        shared_archiver._clone_mirror("https://x/lib.git", dest)
+
+        ((_, kwargs),) = run_cmd.calls
+        assert kwargs["cwd"] == dest.parent
+        assert dest.parent.is_dir()
+
+    def test_lfs_fetch_overlaps_submodules(self, archiver, mocker, monkeypatch, run_cmd):
+        _patch_all(
+            monkeypatch,
+            {
+                "tempfile.TemporaryDirectory": _StagingDirs("/mock/temp"),
+                "pathlib.Path.write_text": _noop,
+            },
+        )
+        lfs_started = threading.Event()
+        mocker.patch.object(archiver, "_handle_lfs", side_effect=lambda *_: lfs_started.set())
+        overlapped = []
+        mocker.patch.object(
+            archiver,
+            "_handle_submodules",
+            side_effect=lambda *a, **kw: overlapped.append(lfs_started.wait(timeout=5)),
+        )
+
+        archiver.archive(compression="none")
+
+        assert overlapped == [True]
+
+    def test_lfs_objects_reused_from_reference_cache(self, run_cmd, tmp_path):
+        cache = tmp_path / "cache" / "repo.git"
+        (cache / "lfs" / "objects" / "ab").mkdir(parents=True)
+        (cache / "lfs" / "objects" / "ab" / "abcd").write_bytes(b"blob")
+        repo = tmp_path / "repo.git"
+        archiver = GitArchiver("https://x/repo.git", Path("/tmp"))
+
+        archiver._handle_lfs(repo, cache)
+
+        assert (repo / "lfs" / "objects" / "ab" / "abcd").read_bytes() == b"blob"
+        assert [kwargs["cwd"] for _, kwargs in run_cmd.calls] == [cache, repo]
+
+    def test_lfs_objects_not_taken_from_other_urls_cache(self, run_cmd, monkeypatch, tmp_path):
+        archiver = GitArchiver(
+            "https://x/repo.git", tmp_path / "out", reference_cache=tmp_path / "cache"
+        )
+        cache = archiver._reference_path("https://x/repo.git")
+        assert cache is not None
+        (cache / "lfs" / "objects" / "ab").mkdir(parents=True)
+        (cache / "lfs" / "objects" / "ab" / "abcd").write_bytes(b"other repo's blob")
+        run_cmd.results["config"] = _cp(stdout="https://y/repo.git\n")
+        monkeypatch.setattr("git_bundle.GitCatFile", _CatFile())  # no .gitmodules
+
+        output = Path(archiver.archive(compression="dir"))
+
+        assert not (output / "repo.git" / "lfs").exists()
+        assert not any(kwargs["cwd"] == cache for cmd, kwargs in run_cmd.calls if "lfs" in cmd)
+
+    def test_archive_flow_uncompressed(self, archiver, monkeypatch, run_cmd):
+        _patch_all(
+            monkeypatch,
+            {
+                "tempfile.TemporaryDirectory": _StagingDirs("/mock/temp"),
+                "pathlib.Path.write_text": _noop,
+            },
+        )
+
+        output_file = archiver.archive(compression="none")
 
-        mock_temp = mocker.patch("tempfile.TemporaryDirectory")
-        mock_temp.return_value.__enter__.return_value = "/mock/temp"
-        mock_run.return_value = MagicMock(returncode=0, stdout="", spec=subprocess.CompletedProcess)
+        tar_calls = [cmd for cmd in run_cmd.cmds if cmd[0] == "tar"]
+        assert len(tar_calls) == 1
+        assert tar_calls[0][1] == "-cf"
+        # 1 MiB records would pad a small uncompressed archive to 1 MiB
+        assert "-b" not in tar_calls[0]
+        assert output_file.endswith(".tar")
+
+    def test_archive_flow_dir(self, monkeypatch, run_cmd, tmp_path):
+        monkeypatch.setattr("git_bundle.GitCatFile", _CatFile())  # no .gitmodules
+        archiver = GitArchiver("https://github.com/user/repo.git", tmp_path)
+
+        output = Path(archiver.archive(compression="dir"))
+
+        assert output.parent == tmp_path
+        assert (output / "archive_manifest.json").exists()
+        assert not run_cmd.ran("tar")
+
+    def test_archive_flow_dir_removed_on_failure(self, run_cmd, tmp_path):
+        run_cmd.results["clone"] = GitBundlerError("clone failed")
+        archiver = GitArchiver("https://github.com/user/repo.git", tmp_path)
+
+        with pytest.raises(GitBundlerError, match="clone failed"):
+            archiver.archive(compression="dir")
+
+        assert list(tmp_path.iterdir()) == []
+
+    def test_archive_flow_dir_refuses_existing_output(self, run_cmd, tmp_path):
+        archiver = GitArchiver("https://github.com/user/repo.git", tmp_path)
+        existing = tmp_path / f"repo_{archiver.timestamp}"
+        (existing / "keep").mkdir(parents=True)
+
+        with pytest.raises(GitBundlerError, match="already exists"):
+            archiver.archive(compression="dir")
+
+        assert (existing / "keep").is_dir()
+        assert run_cmd.calls == []
+
+    def test_archive_stages_in_output_dir_by_default(self, archiver, monkeypatch, run_cmd):
+        staging = _StagingDirs("/tmp/.git_bundle_x")
+        _patch_all(
+            monkeypatch,
+            {
+                "tempfile.TemporaryDirectory": staging,
+                "pathlib.Path.mkdir": _noop,
+                "pathlib.Path.write_text": _noop,
+            },
+        )
+
+        archiver.archive(compression="none")
+
+        assert staging.parents == [archiver.output_dir]
+
+    def test_zstd_level_and_threads(self, mocker):
+        mock_pipeline = mocker.patch("git_bundle.run_pipeline")
+        archiver = GitArchiver("https://x/repo.git", Path("/tmp"), zstd_level=22, zstd_threads=4)
+
+        archiver._create_tarball(Path("/src"), Path("/out.tar.zst"), "zstd")
+
+        consumer = mock_pipeline.call_args.args[1]
+        assert consumer[3:6] == ["--ultra", "-22", "-T4"]
+
+    def test_archive_stages_under_temp_dir(self, monkeypatch, run_cmd):
+        staging = _StagingDirs("/dev/shm/stage")
+        _patch_all(
+            monkeypatch,
+            {
+                "git_bundle.GitCatFile": _CatFile(),  # no .gitmodules
+                "git_bundle.sha256_file": lambda path: "0" * 64,
+                "pathlib.Path.write_text": _noop,
+                "tempfile.TemporaryDirectory": staging,
+            },
+        )
+        archiver = GitArchiver("https://x/repo.git", Path("/tmp"), temp_dir=Path("/dev/shm"))
+
+        archiver.archive(compression="none")
+
+        assert staging.parents == [Path("/dev/shm")]
+
+    def test_archive_flow_zstd(self, archiver, monkeypatch, run_cmd):
+        pipelines = []
+        _patch_all(
+            monkeypatch,
+            {
+                "git_bundle.run_pipeline": lambda *cmds, **kw: pipelines.append(cmds),
+                "pathlib.Path.write_text": _noop,
+                "tempfile.TemporaryDirectory": _StagingDirs("/mock/temp"),
+            },
+        )
 
-        mocker.patch("git_bundle.check_dependency")
         output_file = archiver.archive(compression="zstd")
 
-        tar_calls = [c for c in mock_run.call_args_list if "tar" in c.args[0]]
-        assert len(tar_calls) > 0
-        assert "--use-compress-program=zstd" in tar_calls[0].args[0]
+        # tar streams to stdout and zstd compresses the stream
+        ((producer, consumer),) = pipelines
+        assert producer[:5] == ["tar", "-cf", "-", "-b", str(TAR_BLOCKING_FACTOR)]
+        assert consumer[0] == "zstd"
+        assert "-T0" in consumer
+        assert "--long=27" in consumer
         assert output_file.endswith(".tar.zst")
 
+    def test_checksum_sidecar(self, tmp_path):
+        archive = tmp_path / "repo.tar"
+        archive.write_bytes(b"archive bytes")
+
+        GitArchiver("https://x/repo.git", tmp_path)._write_checksum(archive)
+
+        expected = hashlib.sha256(b"archive bytes").hexdigest()
+        assert (tmp_path / "repo.tar.sha256").read_text() == f"{expected}  repo.tar\n"
+
 
 # ---------------------------------------------------------------------------
 # GitArchiver._write_manifest
@@ -270,8 +796,7 @@ class TestGitArchiverFlow:
 
 
 class TestWriteManifest:
-    def test_manifest_content(self, mocker, tmp_path):
-        mocker.patch("git_bundle.check_dependency")
+    def test_manifest_content(self, tmp_path):
         archiver = GitArchiver("https://github.com/user/repo.git", Path("/tmp"))
         archiver._write_manifest(tmp_path)
 
@@ -283,6 +808,95 @@ class TestWriteManifest:
         assert manifest["repo_name"] == "repo"
         assert manifest["version"] == "2.0"
         assert "archived_at" in manifest
+        assert manifest["git_stats"] == {}  # no repo.git to inspect
+
+    def test_manifest_git_stats(self, tmp_path):
+        subprocess.run(["git", "init", "-q", "--bare", str(tmp_path / "repo.git")], check=True)
+        archiver = GitArchiver("https://github.com/user/repo.git", Path("/tmp"))
+        archiver._write_manifest(tmp_path)
+
+        stats = json.loads((tmp_path / "archive_manifest.json").read_text())["git_stats"]
+        assert stats["count"] == 0
+        assert stats["packs"] == 0
+        assert "size-pack" in stats
+
+
+# ---------------------------------------------------------------------------
+# GitArchiver._dedupe_lfs_objects
+# ---------------------------------------------------------------------------
+
+
+class TestDedupeLfsObjects:
+    @staticmethod
+    def _lfs_object(mirror: Path, oid: str, data: bytes) -> Path:
+        path = mirror / "lfs" / "objects" / oid[:2] / oid[2:4] / oid
+        path.parent.mkdir(parents=True)
+        path.write_bytes(data)
+        return path
+
+    def test_shared_objects_hardlinked(self, tmp_path):
+        main = self._lfs_object(tmp_path / "repo.git", "abcd01", b"shared")
+        sub = self._lfs_object(tmp_path / "submodules" / "lib.git", "abcd01", b"shared")
+        other = self._lfs_object(tmp_path / "submodules" / "lib.git", "ef0123", b"own")
+
+        GitArchiver("https://x/repo.git", Path("/tmp"))._dedupe_lfs_objects(tmp_path)
+
+        assert main.samefile(sub)
+        assert sub.read_bytes() == b"shared"
+        assert other.stat().st_nlink == 1
+
+    def test_nested_submodule_names_hardlinked(self, tmp_path):
+        main = self._lfs_object(tmp_path / "repo.git", "abcd01", b"shared")
+        nested = tmp_path / "submodules" / "vendor" / "pkg.git"
+        sub = self._lfs_object(nested, "abcd01", b"shared")
+
+        GitArchiver("https://x/repo.git", Path("/tmp"))._dedupe_lfs_objects(tmp_path)
+
+        assert main.samefile(sub)
+
+    def test_unsupported_hardlinks_keep_duplicates(self, mocker, tmp_path):
+        mocker.patch("os.link", side_effect=OSError(errno.EXDEV, "cross-device"))
+        main = self._lfs_object(tmp_path / "repo.git", "abcd01", b"shared")
+        sub = self._lfs_object(tmp_path / "submodules" / "lib.git", "abcd01", b"shared")
+
+        GitArchiver("https://x/repo.git", Path("/tmp"))._dedupe_lfs_objects(tmp_path)
+
+        assert not main.samefile(sub)
+
+    def test_link_limit_skips_only_that_object(self, mocker, tmp_path):
+        os_link = os.link
+
+        def link(src, dst):
+            if src.name == "abcd01":
+                raise OSError(errno.EMLINK, "too many links")
+            os_link(src, dst)
+
+        mocker.patch("os.link", side_effect=link)
+        self._lfs_object(tmp_path / "repo.git", "abcd01", b"a")
+        self._lfs_object(tmp_path / "repo.git", "ef0123", b"b")
+        sub_a = self._lfs_object(tmp_path / "submodules" / "lib.git", "abcd01", b"a")
+        sub_b = self._lfs_object(tmp_path / "submodules" / "lib.git", "ef0123", b"b")
+
+        GitArchiver("https://x/repo.git", Path("/tmp"))._dedupe_lfs_objects(tmp_path)
+
+        assert sub_a.stat().st_nlink == 1
+        assert sub_b.stat().st_nlink == 2
+
+    def test_other_link_errors_raised(self, mocker, tmp_path):
+        mocker.patch("os.link", side_effect=OSError(errno.ENOSPC, "no space"))
+        self._lfs_object(tmp_path / "repo.git", "abcd01", b"shared")
+        self._lfs_object(tmp_path / "submodules" / "lib.git", "abcd01", b"shared")
+
+        with pytest.raises(OSError, match="no space"):
+            GitArchiver("https://x/repo.git", Path("/tmp"))._dedupe_lfs_objects(tmp_path)
+
+    def test_no_submodules_is_noop(self, mocker, tmp_path):
+        link = mocker.patch("os.link")
+        self._lfs_object(tmp_path / "repo.git", "abcd01", b"data")
+
+        GitArchiver("https://x/repo.git", Path("/tmp"))._dedupe_lfs_objects(tmp_path)
+
+        link.assert_not_called()
 
 
 # ---------------------------------------------------------------------------
@@ -292,72 +906,114 @@ class TestWriteManifest:
 
 class TestHandleSubmodules:
     @pytest.fixture()
-    def archiver(self, mocker):
-        mocker.patch("git_bundle.check_dependency")
-        return GitArchiver("https://github.com/user/repo.git", Path("/tmp"))
+    def archiver(self, shared_archiver):
+        return shared_archiver
+
+    @pytest.fixture(autouse=True)
+    def cat_file(self, monkeypatch):
+        """Patch GitCatFile; set ``cat_file[_GITMODULES]`` to the .gitmodules blob."""
+        cat = _CatFile({_GITMODULES: b'[submodule "x"]\n'})
+        monkeypatch.setattr("git_bundle.GitCatFile", cat)
+        return cat
 
-    def test_no_gitmodules(self, archiver, mocker):
+    def test_no_gitmodules(self, archiver, run_cmd, cat_file):
         """Should return early if .gitmodules doesn't exist in HEAD."""
-        mock_run = mocker.patch("git_bundle.run_command")
-        mock_run.return_value = MagicMock(returncode=1, stdout="", stderr="")
+        del cat_file[_GITMODULES]
 
-        archiver._handle_submodules(Path("/fake/repo.git"), Path("/fake/temp"))
+        archiver._handle_submodules(_FAKE_REPO, _FAKE_TEMP)
 
-        # Only one call: git show HEAD:.gitmodules
-        assert mock_run.call_count == 1
+        assert cat_file.reads == [_GITMODULES]
+        assert run_cmd.calls == []
 
-    def test_with_submodules(self, archiver, mocker):
+    def test_with_submodules(self, archiver, monkeypatch, run_cmd, cat_file):
         """Should parse .gitmodules and clone each submodule."""
-        gitmodules_content = (
-            '[submodule "lib"]\n    path = libs/lib\n    url = https://example.com/lib.git\n'
-        )
-        config_list_output = (
-            "submodule.lib.path=libs/lib\nsubmodule.lib.url=https://example.com/lib.git\n"
+        cat_file[_GITMODULES] = (
+            b'[submodule "lib"]\n    path = libs/lib\n    url = https://example.com/lib.git\n'
         )
+        monkeypatch.setattr("pathlib.Path.mkdir", _noop)
 
-        call_count = 0
+        archiver._handle_submodules(_FAKE_REPO, _FAKE_TEMP)
 
-        def mock_run_side_effect(cmd, **kwargs):
-            nonlocal call_count
-            call_count += 1
-            if "show" in cmd:
-                return MagicMock(returncode=0, stdout=gitmodules_content)
-            if "config" in cmd and "--list" in cmd:
-                return MagicMock(returncode=0, stdout=config_list_output)
-            return MagicMock(returncode=0, stdout="")
+        # Should have: clone --mirror, lfs fetch
+        clone_calls = [cmd for cmd in run_cmd.cmds if "clone" in cmd]
+        assert len(clone_calls) == 1
+        assert "--mirror" in clone_calls[0]
 
-        mock_run = mocker.patch("git_bundle.run_command", side_effect=mock_run_side_effect)
-        mocker.patch("pathlib.Path.write_text")
-        mocker.patch("pathlib.Path.mkdir")
+    def test_relative_url_resolution(self, archiver, monkeypatch, run_cmd, cat_file):
+        """Relative submodule URLs should be resolved against parent."""
+        cat_file[_GITMODULES] = b'[submodule "dep"]\n\turl = ../dep.git\n'
+        monkeypatch.setattr("pathlib.Path.mkdir", _noop)
 
-        archiver._handle_submodules(Path("/fake/repo.git"), Path("/fake/temp"))
+        archiver._handle_submodules(_FAKE_REPO, _FAKE_TEMP)
 
-        # Should have: show, config, clone --mirror, lfs fetch
-        clone_calls = [c for c in mock_run.call_args_list if "clone" in c.args[0]]
+        clone_calls = [cmd for cmd in run_cmd.cmds if "clone" in cmd]
         assert len(clone_calls) == 1
-        assert "--mirror" in clone_calls[0].args[0]
+        # The URL should be resolved: ../dep.git relative to https://github.com/user/repo.git
+        assert "https://github.com/user/dep.git" in clone_calls[0]
 
-    def test_relative_url_resolution(self, archiver, mocker):
-        """Relative submodule URLs should be resolved against parent."""
-        config_output = "submodule.dep.url=../dep.git\n"
+    def test_multiple_submodules_cloned_in_parallel(self, archiver, monkeypatch, run_cmd, cat_file):
+        """Every submodule should be mirrored when running on the thread pool."""
+        cat_file[_GITMODULES] = b"".join(
+            b'[submodule "%s"]\n\turl = https://example.com/%s.git\n' % (n, n)
+            for n in (b"a", b"b", b"c")
+        )
+        monkeypatch.setattr("pathlib.Path.mkdir", _noop)
 
-        def mock_run_side_effect(cmd, **kwargs):
-            if "show" in cmd:
-                return MagicMock(returncode=0, stdout="[submodule]\n")
-            if "config" in cmd and "--list" in cmd:
-                return MagicMock(returncode=0, stdout=config_output)
-            return MagicMock(returncode=0, stdout="")
+        archiver._handle_submodules(_FAKE_REPO, _FAKE_TEMP, jobs=3)
 
-        mock_run = mocker.patch("git_bundle.run_command", side_effect=mock_run_side_effect)
-        mocker.patch("pathlib.Path.write_text")
-        mocker.patch("pathlib.Path.mkdir")
+        cloned = {cmd[-1] for cmd in run_cmd.cmds if "clone" in cmd}
+        assert cloned == {
+            "/fake/temp/submodules/a.git",
+            "/fake/temp/submodules/b.git",
+            "/fake/temp/submodules/c.git",
+        }
 
-        archiver._handle_submodules(Path("/fake/repo.git"), Path("/fake/temp"))
+    def test_shallow_submodules_fetch_pinned_commit(self, monkeypatch, run_cmd, cat_file):
+        """With shallow_submodules, only the gitlink commit from HEAD is fetched."""
+        archiver = GitArchiver(
+            "https://github.com/user/repo.git", Path("/tmp"), shallow_submodules=True
+        )
+        cat_file[_GITMODULES] = b'[submodule "lib"]\n\tpath = libs/lib\n\turl = ../lib.git\n'
+        sha = "a" * 40
+        ls_tree = _cp(stdout=f"160000 commit {sha}\tlibs/lib\n")
+        run_cmd.results["ls-tree"] = ls_tree
+        monkeypatch.setattr("pathlib.Path.mkdir", _noop)
 
-        clone_calls = [c for c in mock_run.call_args_list if "clone" in c.args[0]]
-        assert len(clone_calls) == 1
-        # The URL should be resolved: ../dep.git relative to https://github.com/user/repo.git
-        assert "https://github.com/user/dep.git" in clone_calls[0].args[0]
+        archiver._handle_submodules(_FAKE_REPO, _FAKE_TEMP)
+
+        cmds = run_cmd.cmds
+        assert not run_cmd.ran("clone")
+        assert ("git", "remote", "add", "origin", "https://github.com/user/lib.git") in cmds
+        assert ("git", "fetch", "--depth=1", "origin", f"{sha}:refs/heads/pinned") in cmds
+
+    def test_pinned_commits_skips_non_gitlinks(self, archiver, run_cmd):
+        ls_tree = f"040000 tree {'a' * 40}\tlibs/lib\n160000 commit {'b' * 40}\tvendor/pkg\n"
+        run_cmd.results["ls-tree"] = _cp(stdout=ls_tree)
+
+        pinned = archiver._pinned_commits(_FAKE_REPO, {"lib": "libs/lib", "vendor": "vendor/pkg"})
+
+        assert pinned == {"vendor": "b" * 40}
+
+    def test_slash_named_submodule_cloned_under_nested_dir(
+        self, archiver, run_cmd, cat_file, tmp_path
+    ):
+        """git names nested submodules after their path, e.g. ``libs/lib``."""
+        cat_file[_GITMODULES] = b'[submodule "libs/lib"]\n\tpath = libs/lib\n\turl = ../lib.git\n'
+
+        archiver._handle_submodules(_FAKE_REPO, tmp_path)
+
+        clone_kwargs = next(kw for cmd, kw in run_cmd.calls if "clone" in cmd)
+        assert clone_kwargs["cwd"] == tmp_path / "submodules" / "libs"
+        assert clone_kwargs["cwd"].is_dir()
+
+    def test_submodule_failure_is_reraised(self, archiver, monkeypatch, run_cmd, cat_file):
+        """A failing submodule clone should surface as GitBundlerError."""
+        cat_file[_GITMODULES] = b'[submodule "bad"]\n\turl = https://example.com/bad.git\n'
+        run_cmd.results["clone"] = GitBundlerError("Command failed: git clone")
+        monkeypatch.setattr("pathlib.Path.mkdir", _noop)
+
+        with pytest.raises(GitBundlerError, match="git clone"):
+            archiver._handle_submodules(_FAKE_REPO, _FAKE_TEMP)
 
 
 # ---------------------------------------------------------------------------
@@ -366,159 +1022,216 @@ class TestHandleSubmodules:
 
 
 class TestGitUnpacker:
+    @pytest.fixture()
+    def contents(self, tmp_path, monkeypatch, run_cmd):
+        """What ``tmp_path / "archive.tar.gz"`` extracts to; edit it before unpacking.
+
+        The ``tar -xf`` call still goes through ``run_cmd``, and the directory
+        is then copied into the extraction directory in its place.
+        """
+        contents = tmp_path / "contents"
+        (contents / "repo.git").mkdir(parents=True)
+        (contents / "archive_manifest.json").write_text(
+            json.dumps({"repo_name": "repo", "source_url": "http://example.com/repo.git"})
+        )
+        (tmp_path / "archive.tar.gz").write_bytes(b"")
+        extract = GitUnpacker._extract
+
+        def extract_contents(self, extract_dir):
+            extract(self, extract_dir)
+            shutil.copytree(contents, extract_dir, dirs_exist_ok=True)
+
+        monkeypatch.setattr(GitUnpacker, "_extract", extract_contents)
+        return contents
+
     def test_missing_archive_raises(self):
         unpacker = GitUnpacker(Path("/nonexistent/archive.tar.gz"), dest_dir=Path("/tmp/dest"))
         with pytest.raises(GitBundlerError, match="Archive not found"):
             unpacker.unpack()
 
-    def test_unpack_happy_path(self, mocker):
-        mock_run = mocker.patch("git_bundle.run_command")
-        mock_run.return_value = MagicMock(returncode=0, stdout="", spec=subprocess.CompletedProcess)
-
-        def exists_side_effect(instance):
-            p = str(instance)
-            if "archive.tar.gz" in p:
-                return True
-            if ".tmp_extract" in p:
-                if p.endswith(".tmp_extract"):
-                    return False
-                if "repo.git" in p:
-                    return True
-                if "archive_manifest.json" in p:
-                    return True
-                if "submodules" in p:
-                    return False
-            return False
-
-        mocker.patch("pathlib.Path.exists", autospec=True, side_effect=exists_side_effect)
-        mocker.patch("pathlib.Path.mkdir")
-        mocker.patch("shutil.rmtree")
-        mocker.patch(
-            "pathlib.Path.read_text",
-            return_value=json.dumps(
-                {"repo_name": "repo", "source_url": "http://example.com/repo.git"}
-            ),
-        )
-
-        unpacker = GitUnpacker(Path("archive.tar.gz"), dest_dir=Path("/tmp/dest"))
-        unpacker.unpack()
+    def test_unpack_happy_path(self, contents, run_cmd, tmp_path):
+        unpacker = GitUnpacker(tmp_path / "archive.tar.gz", dest_dir=tmp_path / "dest")
+        assert unpacker.unpack() == tmp_path / "dest" / "repo"
 
-        # Verify tar extraction
-        assert any("tar" in c.args[0] and "-xf" in c.args[0] for c in mock_run.call_args_list)
+        # Verify tar extraction, with its unread stdout discarded
+        tar_kwargs = next(kw for cmd, kw in run_cmd.calls if cmd[:2] == ("tar", "-xf"))
+        assert tar_kwargs["discard_stdout"] is True
         # Verify clone
-        assert any("clone" in c.args[0] for c in mock_run.call_args_list)
+        assert run_cmd.ran("clone")
         # Verify remote set-url
-        assert any(
-            "remote" in c.args[0] and "set-url" in c.args[0] for c in mock_run.call_args_list
-        )
+        assert run_cmd.ran("remote", "set-url")
+        # The scratch extraction is removed afterwards
+        assert not (tmp_path / "dest" / ".tmp_extract").exists()
+
+    def test_unpack_restores_lfs_locally(self, contents, run_cmd, tmp_path):
+        """Clone should skip smudge; LFS objects are moved then checked out."""
+        (contents / "repo.git" / "lfs" / "objects" / "ab").mkdir(parents=True)
+        (contents / "repo.git" / "lfs" / "objects" / "ab" / "abcd").write_bytes(b"blob")
+
+        unpacker = GitUnpacker(tmp_path / "archive.tar.gz", dest_dir=tmp_path / "dest")
+        repo = unpacker.unpack()
+
+        clone_kwargs = next(kw for cmd, kw in run_cmd.calls if "clone" in cmd)
+        assert clone_kwargs["env"]["GIT_LFS_SKIP_SMUDGE"] == "1"
+        assert (repo / ".git" / "lfs" / "objects" / "ab" / "abcd").read_bytes() == b"blob"
+        assert ("git", "lfs", "checkout") in run_cmd.cmds
 
-    def test_unpack_missing_manifest(self, mocker):
-        def exists_side_effect(instance):
-            p = str(instance)
-            if "archive.tar.gz" in p:
-                return True
-            if "archive_manifest.json" in p:
-                return False
-            if ".tmp_extract" in p:
-                return not p.endswith(".tmp_extract")
-            return False
-
-        mocker.patch("pathlib.Path.exists", autospec=True, side_effect=exists_side_effect)
-        mocker.patch("pathlib.Path.mkdir")
-        mocker.patch("shutil.rmtree")
-        mock_run = mocker.patch("git_bundle.run_command")
-        mock_run.return_value = MagicMock(returncode=0, stdout="", spec=subprocess.CompletedProcess)
-
-        unpacker = GitUnpacker(Path("archive.tar.gz"), dest_dir=Path("/tmp/dest"))
+    def test_unpack_missing_manifest(self, contents, tmp_path):
+        (contents / "archive_manifest.json").unlink()
+
+        unpacker = GitUnpacker(tmp_path / "archive.tar.gz", dest_dir=tmp_path / "dest")
         with pytest.raises(GitBundlerError, match="missing manifest"):
             unpacker.unpack()
 
-    def test_unpack_missing_repo_git(self, mocker):
-        def exists_side_effect(instance):
-            p = str(instance)
-            if "archive.tar.gz" in p:
-                return True
-            if ".tmp_extract" in p:
-                if p.endswith(".tmp_extract"):
-                    return False
-                if "archive_manifest.json" in p:
-                    return True
-                return "repo.git" not in p
-            return False
-
-        mocker.patch("pathlib.Path.exists", autospec=True, side_effect=exists_side_effect)
-        mocker.patch("pathlib.Path.mkdir")
-        mocker.patch("shutil.rmtree")
-        mocker.patch(
-            "pathlib.Path.read_text",
-            return_value=json.dumps(
-                {"repo_name": "repo", "source_url": "http://example.com/repo.git"}
-            ),
-        )
-        mock_run = mocker.patch("git_bundle.run_command")
-        mock_run.return_value = MagicMock(returncode=0, stdout="", spec=subprocess.CompletedProcess)
+    def test_unpack_missing_repo_git(self, contents, tmp_path):
+        (contents / "repo.git").rmdir()
 
-        unpacker = GitUnpacker(Path("archive.tar.gz"), dest_dir=Path("/tmp/dest"))
+        unpacker = GitUnpacker(tmp_path / "archive.tar.gz", dest_dir=tmp_path / "dest")
         with pytest.raises(GitBundlerError, match="missing repo.git"):
             unpacker.unpack()
 
 
+# ---------------------------------------------------------------------------
+# GitUnpacker._restore_lfs
+# ---------------------------------------------------------------------------
+
+
+class TestRestoreLfs:
+    @pytest.fixture()
+    def lfs_layout(self, tmp_path):
+        objects = tmp_path / "repo.git" / "lfs" / "objects"
+        (objects / "ab").mkdir(parents=True)
+        (objects / "ab" / "abcd").write_bytes(b"blob")
+        (tmp_path / "work" / ".git").mkdir(parents=True)
+        return tmp_path
+
+    def test_moves_objects(self, lfs_layout, run_cmd):
+        unpacker = GitUnpacker(_FAKE_ARCHIVE, dest_dir=lfs_layout)
+
+        unpacker._restore_lfs(lfs_layout / "repo.git", lfs_layout / "work")
+
+        restored = lfs_layout / "work" / ".git" / "lfs" / "objects" / "ab" / "abcd"
+        assert restored.read_bytes() == b"blob"
+        assert not (lfs_layout / "repo.git" / "lfs" / "objects").exists()
+        assert run_cmd.cmds == [("git", "lfs", "checkout")]
+
+    def test_copies_across_filesystems(self, lfs_layout, monkeypatch, run_cmd):
+        def replace(src, dst):
+            raise OSError(errno.EXDEV, "cross-device")
+
+        monkeypatch.setattr("os.replace", replace)
+        unpacker = GitUnpacker(_FAKE_ARCHIVE, dest_dir=lfs_layout)
+
+        unpacker._restore_lfs(lfs_layout / "repo.git", lfs_layout / "work")
+
+        restored = lfs_layout / "work" / ".git" / "lfs" / "objects" / "ab" / "abcd"
+        assert restored.read_bytes() == b"blob"
+
+    def test_copies_when_mirror_must_be_kept(self, lfs_layout, run_cmd):
+        unpacker = GitUnpacker(Path("/fake/archive"), dest_dir=lfs_layout)
+
+        unpacker._restore_lfs(lfs_layout / "repo.git", lfs_layout / "work", move=False)
+
+        restored = lfs_layout / "work" / ".git" / "lfs" / "objects" / "ab" / "abcd"
+        assert restored.read_bytes() == b"blob"
+        assert (lfs_layout / "repo.git" / "lfs" / "objects" / "ab" / "abcd").exists()
+
+    def test_unpack_dir_archive_in_place(self, tmp_path, run_cmd):
+        archive = tmp_path / "repo_20250101_000000"
+        (archive / "repo.git").mkdir(parents=True)
+        (archive / "archive_manifest.json").write_text(json.dumps({"repo_name": "repo"}))
+        run_cmd.results["clone"] = _cp(1)
+
+        unpacker = GitUnpacker(archive, dest_dir=tmp_path / "dest")
+        assert unpacker.unpack() == tmp_path / "dest" / "repo"
+
+        assert not run_cmd.ran("tar")
+        assert (archive / "repo.git").is_dir()
+
+    def test_no_lfs_objects(self, tmp_path, run_cmd):
+        unpacker = GitUnpacker(_FAKE_ARCHIVE, dest_dir=tmp_path)
+
+        unpacker._restore_lfs(tmp_path / "repo.git", tmp_path / "work")
+
+        assert run_cmd.calls == []
+
+
 # ---------------------------------------------------------------------------
 # GitUnpacker._restore_submodules
 # ---------------------------------------------------------------------------
 
 
 class TestRestoreSubmodules:
-    def test_no_gitmodules(self, mocker):
-        """Should return early if .gitmodules config fails."""
-        mock_run = mocker.patch("git_bundle.run_command")
-        mock_run.return_value = MagicMock(returncode=1, stdout="", stderr="")
+    @staticmethod
+    def _write_gitmodules(repo: Path, modules: dict[str, str]) -> None:
+        repo.mkdir()
+        (repo / ".gitmodules").write_text(
+            "".join(f'[submodule "{name}"]\n\tpath = {path}\n' for name, path in modules.items())
+        )
 
-        unpacker = GitUnpacker(Path("/fake/archive.tar.gz"), dest_dir=Path("/tmp"))
-        unpacker._restore_submodules(Path("/fake/repo"), Path("/fake/extract"))
+    def test_no_gitmodules(self, run_cmd, tmp_path):
+        """Should return early if the restored repo has no .gitmodules."""
+        unpacker = GitUnpacker(_FAKE_ARCHIVE, dest_dir=Path("/tmp"))
+        unpacker._restore_submodules(tmp_path, tmp_path / "extract")
 
-        assert mock_run.call_count == 1
+        assert run_cmd.calls == []
 
-    def test_no_submodules_source_dir(self, mocker):
+    def test_no_submodules_source_dir(self, run_cmd, tmp_path):
         """Should return early if submodules dir doesn't exist."""
-        config_output = "submodule.lib.path=libs/lib\n"
-
-        mock_run = mocker.patch("git_bundle.run_command")
-        mock_run.return_value = MagicMock(returncode=0, stdout=config_output)
+        self._write_gitmodules(tmp_path / "repo", {"lib": "libs/lib"})
 
-        mocker.patch("pathlib.Path.exists", return_value=False)
+        unpacker = GitUnpacker(_FAKE_ARCHIVE, dest_dir=Path("/tmp"))
+        unpacker._restore_submodules(tmp_path / "repo", tmp_path / "extract")
 
-        unpacker = GitUnpacker(Path("/fake/archive.tar.gz"), dest_dir=Path("/tmp"))
-        unpacker._restore_submodules(Path("/fake/repo"), Path("/fake/extract"))
+        assert run_cmd.calls == []
 
-    def test_happy_path(self, mocker, tmp_path):
-        """Should init, configure URL, and update each submodule."""
-        config_output = "submodule.lib.path=libs/lib\n"
+    def test_unparseable_gitmodules_skipped(self, run_cmd, tmp_path):
+        """The main repo is already restored, so a bad .gitmodules must not fail unpack."""
+        (tmp_path / "repo").mkdir()
+        (tmp_path / "repo" / ".gitmodules").write_text("path = no section\n")
+        (tmp_path / "submodules").mkdir()
 
-        call_idx = 0
+        unpacker = GitUnpacker(_FAKE_ARCHIVE, dest_dir=Path("/tmp"))
+        unpacker._restore_submodules(tmp_path / "repo", tmp_path)
 
-        def mock_run_side_effect(cmd, **kwargs):
-            nonlocal call_idx
-            call_idx += 1
-            if "config" in cmd and "--file" in cmd and "--list" in cmd:
-                return MagicMock(returncode=0, stdout=config_output)
-            return MagicMock(returncode=0, stdout="")
+        assert run_cmd.calls == []
 
-        mock_run = mocker.patch("git_bundle.run_command", side_effect=mock_run_side_effect)
+    def test_happy_path(self, run_cmd, tmp_path):
+        """Should init, then update with the URL pointed at the local mirror."""
+        self._write_gitmodules(tmp_path / "repo", {"lib": "libs/lib"})
 
         # Create the submodules source directory
         sub_source = tmp_path / "submodules"
         sub_source.mkdir()
         (sub_source / "lib.git").mkdir()
 
-        unpacker = GitUnpacker(Path("/fake/archive.tar.gz"), dest_dir=Path("/tmp"))
+        unpacker = GitUnpacker(_FAKE_ARCHIVE, dest_dir=Path("/tmp"))
+        unpacker._restore_submodules(tmp_path / "repo", tmp_path)
+
+        # Should call: submodule init, submodule update
+        cmds = run_cmd.cmds
+        assert len(cmds) == 2
+        assert cmds[0] == ("git", "submodule", "init")
+        mirror = (sub_source / "lib.git").resolve()
+        assert f"submodule.lib.url={mirror}" in cmds[1]
+        assert "update" in cmds[1]
+
+    def test_single_parallel_update(self, run_cmd, tmp_path):
+        """All linked submodules should be updated by one parallel call, by path."""
+        self._write_gitmodules(tmp_path / "repo", {"lib": "libs/lib", "vendor": "vendor/pkg"})
+
+        sub_source = tmp_path / "submodules"
+        sub_source.mkdir()
+        (sub_source / "lib.git").mkdir()
+        (sub_source / "vendor.git").mkdir()
+
+        unpacker = GitUnpacker(_FAKE_ARCHIVE, dest_dir=Path("/tmp"))
         unpacker._restore_submodules(tmp_path / "repo", tmp_path)
 
-        # Should call: config --list, submodule init, config submodule.lib.url, submodule update
-        cmd_strs = [" ".join(c.args[0]) for c in mock_run.call_args_list]
-        assert any("submodule init" in s for s in cmd_strs)
-        assert any("submodule.lib.url" in s for s in cmd_strs)
-        assert any("submodule update" in s for s in cmd_strs)
+        update_calls = [cmd for cmd in run_cmd.cmds if "update" in cmd]
+        assert len(update_calls) == 1
+        assert "--jobs" in update_calls[0]
+        assert update_calls[0][-2:] == ("libs/lib", "vendor/pkg")
 
 
 # ---------------------------------------------------------------------------
@@ -527,67 +1240,129 @@ class TestRestoreSubmodules:
 
 
 class TestGitVerifier:
-    def test_verify_calls_fsck(self, mocker):
-        mock_temp = mocker.patch("tempfile.TemporaryDirectory")
-        mock_temp.return_value.__enter__.return_value = "/tmp/verify"
+    @pytest.fixture()
+    def archive_dir(self, tmp_path):
+        """A directory archive with a main mirror and two submodule mirrors."""
+        root = tmp_path / "repo_20250101_000000"
+        (root / "repo.git").mkdir(parents=True)
+        (root / "submodules" / "lib.git").mkdir(parents=True)
+        (root / "submodules" / "vendor" / "pkg.git" / "objects").mkdir(parents=True)
+        (root / "archive_manifest.json").write_text(json.dumps({"repo_name": "repo"}))
+        return root
+
+    @staticmethod
+    def _fsck_dirs(run_cmd, *subcommand):
+        return [kw["cwd"] for cmd, kw in run_cmd.calls if cmd[1:] == subcommand]
+
+    @pytest.mark.parametrize(
+        "lfs_mirrors",
+        [
+            pytest.param([], id="no-lfs"),
+            pytest.param(["submodules/lib.git"], id="submodule-lfs"),
+            pytest.param(["repo.git", "submodules/vendor/pkg.git"], id="main-and-nested-lfs"),
+        ],
+    )
+    def test_verify_fscks_every_mirror(self, run_cmd, archive_dir, lfs_mirrors):
+        for mirror in lfs_mirrors:
+            (archive_dir / mirror / "lfs" / "objects").mkdir(parents=True)
+
+        GitVerifier.verify(archive_dir, verbose=False)
+
+        assert sorted(self._fsck_dirs(run_cmd, "fsck", "--full")) == [
+            archive_dir / "repo.git",
+            archive_dir / "submodules" / "lib.git",
+            archive_dir / "submodules" / "vendor" / "pkg.git",
+        ]
+        lfs_checked = sorted(self._fsck_dirs(run_cmd, "lfs", "fsck"))
+        assert lfs_checked == sorted(archive_dir / mirror for mirror in lfs_mirrors)
+        assert not run_cmd.ran("clone")
+
+    def test_verify_extracts_tarball_to_scratch(self, mocker, run_cmd, archive_dir, tmp_path):
+        archive = tmp_path / "repo.tar.zst"
+        archive.write_bytes(b"")
+        (tmp_path / "scratch_parent").mkdir()
 
-        mock_unpack = mocker.patch.object(GitUnpacker, "unpack")
-        mock_unpack.return_value = Path("/tmp/verify/repo")
+        def extract(self, extract_dir):
+            shutil.copytree(archive_dir, extract_dir, dirs_exist_ok=True)
 
-        mock_run = mocker.patch("git_bundle.run_command")
-        mock_run.return_value = MagicMock(returncode=0, stdout="", spec=subprocess.CompletedProcess)
+        mocker.patch.object(GitUnpacker, "_extract", autospec=True, side_effect=extract)
 
-        mocker.patch("pathlib.Path.exists", return_value=False)
+        GitVerifier.verify(archive, verbose=False, temp_dir=tmp_path / "scratch_parent")
 
-        GitVerifier.verify(Path("archive.tar.gz"), verbose=False)
+        fsck_dirs = self._fsck_dirs(run_cmd, "fsck", "--full")
+        assert len(fsck_dirs) == 3
+        assert all(d.is_relative_to(tmp_path / "scratch_parent") for d in fsck_dirs)
 
-        fsck_calls = [c for c in mock_run.call_args_list if "fsck" in c.args[0]]
-        assert len(fsck_calls) == 1
-        assert "--full" in fsck_calls[0].args[0]
+    def test_verify_rejects_missing_manifest(self, run_cmd, archive_dir):
+        (archive_dir / "archive_manifest.json").unlink()
 
-    def test_verify_checks_lfs_when_present(self, mocker):
-        mock_temp = mocker.patch("tempfile.TemporaryDirectory")
-        mock_temp.return_value.__enter__.return_value = "/tmp/verify"
-        mock_unpack = mocker.patch.object(GitUnpacker, "unpack")
-        mock_unpack.return_value = Path("/tmp/verify/repo")
+        with pytest.raises(GitBundlerError, match="missing manifest"):
+            GitVerifier.verify(archive_dir, verbose=False)
+        assert run_cmd.calls == []
+
+    def test_verify_reports_every_failed_check(self, run_cmd, archive_dir):
+        for name in ("repo.git", "pkg.git"):
+            run_cmd.route(
+                lambda cmd, cwd, name=name: cwd.name == name,
+                GitBundlerError(f"Command failed: git fsck in {name}"),
+            )
+
+        with pytest.raises(GitBundlerError) as excinfo:
+            GitVerifier.verify(archive_dir, verbose=False)
+
+        assert len(run_cmd.calls) == 3
+        assert "in repo.git" in str(excinfo.value)
+        assert "in pkg.git" in str(excinfo.value)
+        assert "in lib.git" not in str(excinfo.value)
+
+    def test_verify_rejects_checksum_mismatch(self, mocker, tmp_path):
+        archive = tmp_path / "archive.tar.gz"
+        archive.write_bytes(b"tampered")
+        (tmp_path / "archive.tar.gz.sha256").write_text(f"{'0' * 64}  archive.tar.gz\n")
+        mock_extract = mocker.patch.object(GitUnpacker, "_extract")
+
+        with pytest.raises(GitBundlerError, match="Checksum mismatch"):
+            GitVerifier.verify(archive, verbose=False)
+        mock_extract.assert_not_called()
+
+    @pytest.mark.parametrize("sidecar", ["", "  \n", "deadbeef  archive.tar.gz\n"])
+    def test_verify_rejects_malformed_checksum_file(self, sidecar, mocker, tmp_path):
+        archive = tmp_path / "archive.tar.gz"
+        archive.write_bytes(b"data")
+        (tmp_path / "archive.tar.gz.sha256").write_text(sidecar)
+        mock_extract = mocker.patch.object(GitUnpacker, "_extract")
+
+        with pytest.raises(GitBundlerError, match="Malformed checksum file"):
+            GitVerifier.verify(archive, verbose=False)
+        mock_extract.assert_not_called()
 
-        def exists_side_effect(instance):
-            p = str(instance)
-            if "lfs" in p:
-                return True
-            if ".gitmodules" in p:
-                return False
-            return False
 
-        mocker.patch("pathlib.Path.exists", autospec=True, side_effect=exists_side_effect)
-        mock_run = mocker.patch("git_bundle.run_command")
-        mock_run.return_value = MagicMock(returncode=0, stdout="", spec=subprocess.CompletedProcess)
+# ---------------------------------------------------------------------------
+# Command line
+# ---------------------------------------------------------------------------
 
-        GitVerifier.verify(Path("archive.tar.gz"), verbose=False)
 
-        lfs_calls = [
-            c for c in mock_run.call_args_list if "lfs" in c.args[0] and "fsck" in c.args[0]
-        ]
-        assert len(lfs_calls) == 1
+class TestCommandLine:
+    @pytest.mark.parametrize("value", ["-1", "two"])
+    def test_invalid_zstd_threads_rejected(self, value, capsys):
+        with pytest.raises(SystemExit):
+            main(["archive", "https://x/repo.git", "--zstd-threads", value])
 
-    def test_verify_checks_submodules_when_present(self, mocker):
-        mock_temp = mocker.patch("tempfile.TemporaryDirectory")
-        mock_temp.return_value.__enter__.return_value = "/tmp/verify"
-        mock_unpack = mocker.patch.object(GitUnpacker, "unpack")
-        mock_unpack.return_value = Path("/tmp/verify/repo")
+        assert "--zstd-threads" in capsys.readouterr().err
 
-        def exists_side_effect(instance):
-            p = str(instance)
-            if "lfs" in p:
-                return False
-            return ".gitmodules" in p
+    @pytest.mark.parametrize("value", ["0", "-4"])
+    def test_non_positive_lfs_jobs_rejected(self, value, capsys):
+        with pytest.raises(SystemExit):
+            main(["archive", "https://x/repo.git", "--lfs-jobs", value])
 
-        mocker.patch("pathlib.Path.exists", autospec=True, side_effect=exists_side_effect)
-        mock_run = mocker.patch("git_bundle.run_command")
-        mock_run.return_value = MagicMock(returncode=0, stdout="", spec=subprocess.CompletedProcess)
+        assert "--lfs-jobs" in capsys.readouterr().err
 
-        GitVerifier.verify(Path("archive.tar.gz"), verbose=False)
+    @pytest.mark.parametrize("value", ["fast", "0", "23"])
+    def test_invalid_zstd_level_env_names_the_variable(self, value, monkeypatch, capsys):
+        monkeypatch.setenv("GIT_BUNDLE_ZSTD_LEVEL", value)
+        with pytest.raises(SystemExit):
+            main(["archive", "https://x/repo.git"])
 
-        sub_calls = [c for c in mock_run.call_args_list if "submodule" in c.args[0]]
-        assert len(sub_calls) == 1
-        assert "status" in sub_calls[0].args[0]
+        err = capsys.readouterr().err
+        assert "$GIT_BUNDLE_ZSTD_LEVEL" in err
+        assert "--zstd-level" not in err